@@ -1,30 +1,38 @@
 from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterator, List
+import json
 import time
 import logging
 import uuid
 
-from app.services.db_interaction import DocumentRepository, ChunkRepository
+from app.services.db_interaction import DatabaseManager, DocumentRepository, ChunkRepository
 from app.services.llm_service import EmbeddingService
+from app.services.rerank_service import RerankService
+from app.services.vector_snapshot import VectorSnapshotWriter, get_vector_snapshot
 from app.utils.utils import TextProcessor, FileValidator
+from app.models.models import DEFAULT_COLLECTION
 from app.models.scheme import (
     DocumentCreate, ChunkCreate, QueryRequest, 
-    QueryResponse, IngestResponse, QueryResult
+    QueryResponse, IngestResponse, QueryResult, QueryContext,
+    StreamQueryRequest, StreamedQueryResult
 )
 
 class DocumentController:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, db_manager: DatabaseManager):
         self.db = db
+        self.db_manager = db_manager
         self.document_repo = DocumentRepository(db)
         self.chunk_repo = ChunkRepository(db)
         self.embedding_service = EmbeddingService()
+        self.rerank_service = RerankService()
         self.text_processor = TextProcessor()
         self.file_validator = FileValidator()
         self.logger = logging.getLogger(__name__)
     
-    async def ingest_document(self, file: UploadFile) -> IngestResponse:
-        """Process and ingest a document"""
+    async def ingest_document(self, file: UploadFile, collection: str = DEFAULT_COLLECTION) -> IngestResponse:
+        """Process and ingest a document into a collection"""
         start_time = time.time()
         
         try:
@@ -38,6 +46,11 @@ class DocumentController:
                 file_size=file_size
             )
             
+            try:
+                self.db_manager.partition_name(collection)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
             # Extract text based on file type
             file_extension = self.file_validator.get_file_extension(file.filename)
             
@@ -57,21 +70,28 @@ class DocumentController:
             if not chunks:
                 raise HTTPException(status_code=400, detail="No text content found in file")
             
+            # Generate embeddings for all chunks before touching the database, so no
+            # transaction is held open across the (slow) embedding calls
+            embeddings = self.embedding_service.get_embeddings_batch(chunks)
+            
+            # Make sure the collection's partition exists before writing chunks
+            self.db_manager.create_partition(collection)
+            
             # Create document record
             document_data = DocumentCreate(
                 filename=file.filename,
-                content_type=file.content_type
+                content_type=file.content_type,
+                collection=collection,
+                chunk_overlap=self.text_processor.chunk_overlap
             )
             document = self.document_repo.create_document(document_data)
             
-            # Generate embeddings for all chunks
-            embeddings = self.embedding_service.get_embeddings_batch(chunks)
-            
             # Create chunk records
             chunk_data_list = []
             for i, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
                 chunk_data = ChunkCreate(
                     document_id=document.id,
+                    collection=collection,
                     chunk_text=chunk_text,
                     chunk_index=i,
                     embedding=embedding
@@ -80,11 +100,13 @@ class DocumentController:
             
             # Save chunks to database
             self.chunk_repo.create_chunks_batch(chunk_data_list)
+            await self._refresh_vector_snapshot()
             
             processing_time = time.time() - start_time
             
             return IngestResponse(
                 document_id=document.id,
+                collection=collection,
                 filename=file.filename,
                 chunks_processed=len(chunks),
                 processing_time=processing_time,
@@ -97,6 +119,20 @@ class DocumentController:
                 raise e
             raise HTTPException(status_code=500, detail=str(e))
     
+    async def _refresh_vector_snapshot(self):
+        """Append newly ingested chunks to the vector snapshot, if one is configured"""
+        snapshot = get_vector_snapshot()
+        if snapshot is None:
+            return
+        
+        # The chunks are already committed; a skipped or failed refresh is caught up by the next one.
+        # Runs off the event loop and never waits for another writer's lock.
+        try:
+            writer = VectorSnapshotWriter(snapshot.directory)
+            await run_in_threadpool(writer.refresh, self.db, blocking=False)
+        except Exception as e:
+            self.logger.error(f"Error refreshing vector snapshot: {e}")
+    
     def query_documents(self, query_request: QueryRequest) -> QueryResponse:
         """Query documents using semantic search"""
         start_time = time.time()
@@ -105,28 +141,71 @@ class DocumentController:
             # Generate embedding for query
             query_embedding = self.embedding_service.get_embedding(query_request.query)
             
+            rerank = query_request.rerank
+            if rerank is None:
+                rerank = self.rerank_service.enabled
+            
+            # Over-fetch candidates cheaply from the vector index when re-ranking
+            fetch_limit = query_request.limit
+            if rerank:
+                fetch_limit = max(query_request.candidates or self.rerank_service.candidates, query_request.limit)
+            
             # Search for similar chunks
             similar_chunks = self.chunk_repo.search_similar_chunks(
                 query_embedding=query_embedding,
-                limit=query_request.limit
+                limit=fetch_limit,
+                collections=query_request.collections
             )
             
-            # Format results
+            if rerank:
+                ranked_chunks = self.rerank_service.rerank(
+                    query=query_request.query,
+                    candidates=similar_chunks,
+                    limit=query_request.limit
+                )
+            else:
+                ranked_chunks = [(chunk, score, None) for chunk, score in similar_chunks]
+            
+            # Format results; with context expansion the text is only sent once, inside contexts
+            include_text = query_request.context_window == 0
             results = []
-            for chunk, similarity_score in similar_chunks:
+            for chunk, similarity_score, rerank_score in ranked_chunks:
                 result = QueryResult(
-                    chunk_text=chunk.chunk_text,
+                    chunk_text=chunk.chunk_text if include_text else None,
                     similarity_score=similarity_score,
                     document_id=chunk.document_id,
-                    chunk_index=chunk.chunk_index
+                    chunk_index=chunk.chunk_index,
+                    rerank_score=rerank_score
                 )
                 results.append(result)
             
+            # Expand hits with neighbouring chunks, merged and de-duplicated in the database
+            contexts = None
+            if query_request.context_window > 0:
+                context_rows = self.chunk_repo.expand_context(
+                    hits=[(chunk, similarity_score) for chunk, similarity_score, _ in ranked_chunks],
+                    window=query_request.context_window,
+                    overlap=self.text_processor.chunk_overlap
+                )
+                contexts = [
+                    QueryContext(
+                        document_id=document_id,
+                        start_chunk_index=start_chunk_index,
+                        end_chunk_index=end_chunk_index,
+                        hit_chunk_indexes=hit_chunk_indexes,
+                        similarity_score=similarity_score,
+                        context_text=context_text
+                    )
+                    for document_id, start_chunk_index, end_chunk_index, hit_chunk_indexes, similarity_score, context_text
+                    in context_rows
+                ]
+            
             processing_time = time.time() - start_time
             
             return QueryResponse(
                 query=query_request.query,
                 results=results,
+                contexts=contexts,
                 processing_time=processing_time
             )
             
@@ -134,6 +213,62 @@ class DocumentController:
             self.logger.error(f"Error querying documents: {e}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    def stream_query(self, query_request: StreamQueryRequest) -> Iterator[str]:
+        """Query documents and stream results as they are read from the cursor.
+        
+        Results come back in vector order; re-ranking needs the whole candidate
+        set and is only applied by `query_documents`.
+        """
+        start_time = time.time()
+        
+        # Embed before streaming starts so failures still map to an HTTP error
+        try:
+            query_embedding = self.embedding_service.get_embedding(query_request.query)
+        except Exception as e:
+            self.logger.error(f"Error querying documents: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        rows = self.chunk_repo.iter_similar_chunks(
+            query_embedding=query_embedding,
+            limit=query_request.limit,
+            include_text=not query_request.ids_only,
+            collections=query_request.collections
+        )
+        return self._format_stream(rows, query_request.format, start_time)
+    
+    def _format_stream(self, rows: Iterator[tuple], stream_format: str, start_time: float) -> Iterator[str]:
+        """Encode streamed rows as NDJSON lines or SSE events"""
+        count = 0
+        try:
+            for row in rows:
+                result = StreamedQueryResult(
+                    chunk_id=row[0],
+                    document_id=row[1],
+                    chunk_index=row[2],
+                    similarity_score=row[3],
+                    chunk_text=row[4] if len(row) > 4 else None
+                )
+                payload = result.model_dump_json(exclude_none=True)
+                count += 1
+                
+                if stream_format == "sse":
+                    yield f"event: result\ndata: {payload}\n\n"
+                else:
+                    yield payload + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            self.logger.error(f"Error streaming query results: {e}")
+            error = json.dumps({"error": str(e)})
+            if stream_format == "sse":
+                yield f"event: error\ndata: {error}\n\n"
+            else:
+                yield error + "\n"
+            return
+        
+        if stream_format == "sse":
+            summary = json.dumps({"count": count, "processing_time": time.time() - start_time})
+            yield f"event: done\ndata: {summary}\n\n"
+
 class HealthController:
     def __init__(self, db: Session):
         self.db = db
@@ -0,0 +1,123 @@
+"""One-shot management commands.
+
+Usage (from the backend directory):
+    python -m app.manage migrate
+    python -m app.manage snapshot [--interval 30]
+    python -m app.manage import-times [--module app.main] [--top 25]
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def migrate(args: argparse.Namespace) -> int:
+    """Enable pgvector and create tables and partitions"""
+    from app.services.db_interaction import DatabaseManager
+
+    db_manager = DatabaseManager()
+    db_manager.create_tables()
+    logger.info("Database migrated successfully")
+    return 0
+
+
+def snapshot(args: argparse.Namespace) -> int:
+    """Refresh the on-disk vector snapshot, once or every `interval` seconds"""
+    from app.services.db_interaction import DatabaseManager
+    from app.services.vector_snapshot import VectorSnapshotWriter
+
+    directory = os.getenv("VECTOR_SNAPSHOT_DIR")
+    if not directory:
+        logger.error("VECTOR_SNAPSHOT_DIR environment variable is required")
+        return 1
+
+    db_manager = DatabaseManager()
+    writer = VectorSnapshotWriter(directory)
+    while True:
+        db = db_manager.SessionLocal()
+        try:
+            writer.refresh(db)
+        finally:
+            db.close()
+
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+def parse_import_times(output: str) -> List[Tuple[str, int, int]]:
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us) tuples"""
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header line
+        timings.append((fields[2].strip(), self_us, cumulative_us))
+    return timings
+
+
+def import_times(args: argparse.Namespace) -> int:
+    """Report per-module import time of a module in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        # -X importtime also writes to stderr, the traceback is at the end
+        logger.error(result.stderr.strip().splitlines()[-1])
+        return result.returncode
+
+    timings = parse_import_times(result.stderr)
+    if not timings:
+        logger.error("No import timings recorded")
+        return 1
+
+    # Interpreter start-up imports (site, encodings) are listed too; report the target's own total
+    total_us = next(
+        (cumulative for module, _, cumulative in timings if module == args.module),
+        max(cumulative for _, _, cumulative in timings)
+    )
+    print(f"Importing {args.module} took {total_us / 1000:.1f} ms across {len(timings)} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_us, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="Mini-RAG Service management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Create the pgvector extension, tables and partitions")
+    migrate_parser.set_defaults(func=migrate)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Refresh the memory-mapped vector snapshot")
+    snapshot_parser.add_argument("--interval", type=float, default=0, help="Keep refreshing every N seconds (default: once)")
+    snapshot_parser.set_defaults(func=snapshot)
+
+    import_parser = subparsers.add_parser("import-times", help="Report import time per module")
+    import_parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    import_parser.add_argument("--top", type=int, default=25, help="Number of modules to show (default: 25)")
+    import_parser.set_defaults(func=import_times)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 from pgvector.sqlalchemy import Vector
@@ -6,12 +6,19 @@ import uuid
 
 Base = declarative_base()
 
+# Chunks are list-partitioned by collection; names double as partition suffixes
+DEFAULT_COLLECTION = "default"
+COLLECTION_PATTERN = r"^[a-z0-9_]{1,48}$"
+
 class Document(Base):
     __tablename__ = "documents"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String(255), nullable=False)
     content_type = Column(String(100), nullable=False)
+    collection = Column(String(48), nullable=False, default=DEFAULT_COLLECTION, server_default=DEFAULT_COLLECTION)
+    # Words each chunk repeats from its predecessor, as configured when the document was chunked
+    chunk_overlap = Column(Integer, nullable=True)
     upload_timestamp = Column(DateTime, default=func.now())
     
     def __repr__(self):
@@ -19,13 +26,24 @@ class Document(Base):
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    __table_args__ = (
+        # Serves neighbour lookups when expanding query hits with surrounding context
+        Index("ix_chunks_document_id_chunk_index", "document_id", "chunk_index"),
+        # Serves incremental vector snapshot refreshes from a created_at high-water mark
+        Index("ix_chunks_created_at", "created_at"),
+        {"postgresql_partition_by": "LIST (collection)"},
+    )
     
+    # The partition key has to be part of the primary key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    collection = Column(String(48), primary_key=True, default=DEFAULT_COLLECTION, server_default=DEFAULT_COLLECTION)
     document_id = Column(UUID(as_uuid=True), nullable=False)
     chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer, nullable=False)
     embedding = Column(Vector(768), nullable=False) 
-    created_at = Column(DateTime, default=func.now())
+    # Insert time rather than now()'s transaction start, so vector snapshot refreshes
+    # keyed on created_at are not skipped by long-running transactions
+    created_at = Column(DateTime, default=func.clock_timestamp())
     
     def __repr__(self):
-        return f"<Chunk(id={self.id}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
\ No newline at end of file
+        return f"<Chunk(id={self.id}, collection={self.collection}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
\ No newline at end of file
@@ -1,16 +1,23 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, constr
+from typing import List, Literal, Optional
 from datetime import datetime
 import uuid
 
+from app.models.models import DEFAULT_COLLECTION, COLLECTION_PATTERN
+
+CollectionName = constr(pattern=COLLECTION_PATTERN)
+
 class DocumentCreate(BaseModel):
     filename: str
     content_type: str
+    collection: CollectionName = DEFAULT_COLLECTION
+    chunk_overlap: Optional[int] = None
 
 class DocumentResponse(BaseModel):
     id: uuid.UUID
     filename: str
     content_type: str
+    collection: str
     upload_timestamp: datetime
     chunks_count: int
     
@@ -19,12 +26,14 @@ class DocumentResponse(BaseModel):
 
 class ChunkCreate(BaseModel):
     document_id: uuid.UUID
+    collection: CollectionName = DEFAULT_COLLECTION
     chunk_text: str
     chunk_index: int
     embedding: List[float]
 
 class ChunkResponse(BaseModel):
     id: uuid.UUID
+    collection: str
     document_id: uuid.UUID
     chunk_text: str
     chunk_index: int
@@ -36,20 +45,49 @@ class ChunkResponse(BaseModel):
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=1000, description="Query string for semantic search")
     limit: int = Field(default=3, ge=1, le=10, description="Number of results to return")
+    rerank: Optional[bool] = Field(default=None, description="Re-rank vector candidates before returning; defaults to RERANK_ENABLED")
+    candidates: Optional[int] = Field(default=None, ge=1, le=100, description="Number of vector candidates to fetch for re-ranking; defaults to RERANK_CANDIDATES")
+    collections: Optional[List[CollectionName]] = Field(default=None, min_length=1, max_length=20, description="Collections to search; searches all collections when omitted")
+    context_window: int = Field(default=0, ge=0, le=5, description="Expand each result with this many neighbouring chunks on either side; result text is then only returned in contexts")
 
 class QueryResult(BaseModel):
-    chunk_text: str
+    chunk_text: Optional[str] = None
     similarity_score: float
     document_id: uuid.UUID
     chunk_index: int
+    rerank_score: Optional[float] = None
+
+class StreamQueryRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=1000, description="Query string for semantic search")
+    limit: int = Field(default=10, ge=1, le=100, description="Number of results to stream")
+    format: Literal["ndjson", "sse"] = Field(default="ndjson", description="Stream as newline-delimited JSON or Server-Sent Events")
+    ids_only: bool = Field(default=False, description="Return chunk ids, offsets and scores without chunk text")
+    collections: Optional[List[CollectionName]] = Field(default=None, min_length=1, max_length=20, description="Collections to search; searches all collections when omitted")
+
+class StreamedQueryResult(BaseModel):
+    chunk_id: uuid.UUID
+    document_id: uuid.UUID
+    chunk_index: int
+    similarity_score: float
+    chunk_text: Optional[str] = None
+
+class QueryContext(BaseModel):
+    document_id: uuid.UUID
+    start_chunk_index: int
+    end_chunk_index: int
+    hit_chunk_indexes: List[int]
+    similarity_score: float
+    context_text: str
 
 class QueryResponse(BaseModel):
     query: str
     results: List[QueryResult]
+    contexts: Optional[List[QueryContext]] = None
     processing_time: float
 
 class IngestResponse(BaseModel):
     document_id: uuid.UUID
+    collection: str
     filename: str
     chunks_processed: int
     processing_time: float
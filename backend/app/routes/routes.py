@@ -1,24 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from app.services.db_interaction import DatabaseManager
 from sqlalchemy.orm import Session
 from typing import List
+from functools import lru_cache
 
 from app.controller.controller import DocumentController, HealthController
-from app.models.scheme import QueryRequest, QueryResponse, IngestResponse, ErrorResponse
-
-# Initialize database manager
-db_manager = DatabaseManager()
+from app.models.models import DEFAULT_COLLECTION
+from app.models.scheme import QueryRequest, QueryResponse, IngestResponse, ErrorResponse, StreamQueryRequest
 
 # Create API router
 api_router = APIRouter()
 
+# Database manager is created on first request rather than at import time
+@lru_cache(maxsize=None)
+def get_db_manager() -> DatabaseManager:
+    return DatabaseManager()
+
 # Dependency to get database session
 def get_db():
-    return next(db_manager.get_db())
+    yield from get_db_manager().get_db()
 
 @api_router.post("/ingest", response_model=IngestResponse)
 async def ingest_document(
     file: UploadFile = File(...),
+    collection: str = Form(DEFAULT_COLLECTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -27,10 +33,10 @@ async def ingest_document(
     - Accepts PDF or TXT files
     - Chunks the text into ~500-word segments
     - Generates embeddings for each chunk
-    - Stores chunks and embeddings in the database
+    - Stores chunks and embeddings in the collection's partition
     """
-    controller = DocumentController(db)
-    return await controller.ingest_document(file)
+    controller = DocumentController(db, get_db_manager())
+    return await controller.ingest_document(file, collection)
 
 @api_router.post("/query", response_model=QueryResponse)
 def query_documents(
@@ -45,9 +51,38 @@ def query_documents(
     - Performs nearest-neighbor search
     - Returns top-k most similar text chunks
     """
-    controller = DocumentController(db)
+    controller = DocumentController(db, get_db_manager())
     return controller.query_documents(query_request)
 
+@api_router.post("/query/stream")
+def stream_query_documents(
+    query_request: StreamQueryRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Query documents and stream results as they are fetched.
+    
+    - Streams newline-delimited JSON (`format=ndjson`) or Server-Sent Events (`format=sse`)
+    - Set `ids_only` to receive chunk ids, chunk indexes and scores without text
+    - Results are in vector similarity order (no re-ranking)
+    """
+    controller = DocumentController(db, get_db_manager())
+    stream = controller.stream_query(query_request)
+    media_type = "text/event-stream" if query_request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream, media_type=media_type)
+
+@api_router.get("/collections")
+def list_collections():
+    """
+    List collections.
+    
+    - Returns the collections that have a chunks partition
+    """
+    try:
+        return {"collections": get_db_manager().list_partitions()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/health")
 def health_check(db: Session = Depends(get_db)):
     """
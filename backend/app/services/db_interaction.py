@@ -1,40 +1,159 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, select, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import os
+import re
+import threading
 from dotenv import load_dotenv
 import logging
 
-from app.models.models import Base, Document, Chunk
+from app.models.models import Base, Document, Chunk, DEFAULT_COLLECTION, COLLECTION_PATTERN
 from app.models.scheme import DocumentCreate, ChunkCreate
+from app.services.vector_snapshot import VectorSnapshot, get_vector_snapshot
 
 load_dotenv()
 
+# Shared by all multi-collection searches so per-partition queries are bounded per process
+_partition_executor: Optional[ThreadPoolExecutor] = None
+_partition_executor_lock = threading.Lock()
+
+
+def _partition_search_workers() -> int:
+    return int(os.getenv("PARTITION_SEARCH_WORKERS", 8))
+
+
+def _get_partition_executor() -> ThreadPoolExecutor:
+    global _partition_executor
+    with _partition_executor_lock:
+        if _partition_executor is None:
+            _partition_executor = ThreadPoolExecutor(
+                max_workers=_partition_search_workers(),
+                thread_name_prefix="partition-search"
+            )
+    return _partition_executor
+
 class DatabaseManager:
     def __init__(self):
         self.database_url = os.getenv("DATABASE_URL")
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable is required")
         
-        self.engine = create_engine(self.database_url)
+        # Leave room for the partition search workers on top of the default 5 + 10 connections
+        self.engine = create_engine(self.database_url, max_overflow=10 + _partition_search_workers())
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         self.logger = logging.getLogger(__name__)
+        self._known_partitions = set()
+    
+    # Columns added to existing tables since they were first created; create_all skips existing tables
+    _column_upgrades = [
+        ("documents", "collection", f"VARCHAR(48) NOT NULL DEFAULT '{DEFAULT_COLLECTION}'"),
+        ("documents", "chunk_overlap", "INTEGER"),
+    ]
     
     def create_tables(self):
-        """Create all tables and enable pgvector extension"""
+        """Create or upgrade all tables and enable pgvector extension.
+        
+        Upgrades an existing database in the same transaction: missing columns
+        are added, and an unpartitioned chunks table (from before collections)
+        is converted by copying its rows into the default collection.
+        """
         try:
-            with self.engine.connect() as connection:
+            with self.engine.begin() as connection:
                 # Enable pgvector extension
                 connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
-                connection.commit()
+                
+                legacy_chunks = self._detach_unpartitioned_chunks(connection)
+                Base.metadata.create_all(bind=connection)
+                for table, column, definition in self._column_upgrades:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}"))
+                self._create_partition(connection, DEFAULT_COLLECTION)
+                
+                if legacy_chunks:
+                    copied = connection.execute(text(f"""
+                        INSERT INTO {Chunk.__tablename__}
+                            (id, collection, document_id, chunk_text, chunk_index, embedding, created_at)
+                        SELECT id, :collection, document_id, chunk_text, chunk_index, embedding, created_at
+                        FROM {legacy_chunks}
+                    """), {"collection": DEFAULT_COLLECTION}).rowcount
+                    connection.execute(text(f"DROP TABLE {legacy_chunks}"))
+                    self.logger.info(f"Moved {copied} chunks into the '{DEFAULT_COLLECTION}' collection")
             
-            Base.metadata.create_all(bind=self.engine)
+            self._known_partitions.add(DEFAULT_COLLECTION)
             self.logger.info("Tables created successfully")
         except SQLAlchemyError as e:
             self.logger.error(f"Error creating tables: {e}")
             raise
     
+    def _detach_unpartitioned_chunks(self, connection) -> Optional[str]:
+        """Rename a pre-partitioning chunks table out of the way, returning its new name"""
+        table = Chunk.__tablename__
+        is_unpartitioned = connection.execute(text("""
+            SELECT NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = c.oid)
+            FROM pg_class c
+            WHERE c.relname = :table AND c.relkind IN ('r', 'p') AND pg_table_is_visible(c.oid)
+        """), {"table": table}).scalar()
+        if not is_unpartitioned:
+            return None
+        
+        legacy = f"{table}_unpartitioned"
+        self.logger.info(f"Converting unpartitioned {table} table to collection partitions")
+        connection.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        # The primary key keeps its name across the rename and would clash with the new table's
+        connection.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey"))
+        return legacy
+    
+    @staticmethod
+    def partition_name(collection: str) -> str:
+        """Get the chunks partition table name for a collection"""
+        if not re.fullmatch(COLLECTION_PATTERN, collection):
+            raise ValueError(f"Invalid collection name: {collection}")
+        return f"{Chunk.__tablename__}_{collection}"
+    
+    def create_partition(self, collection: str):
+        """Create the chunks partition and its vector index for a collection if missing"""
+        if collection in self._known_partitions:
+            return
+        
+        try:
+            with self.engine.begin() as connection:
+                self._create_partition(connection, collection)
+            self._known_partitions.add(collection)
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error creating partition for collection {collection}: {e}")
+            raise
+    
+    def _create_partition(self, connection, collection: str):
+        partition = self.partition_name(collection)
+        # DDL cannot take bind parameters; the name is validated by partition_name
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition} "
+            f"PARTITION OF {Chunk.__tablename__} FOR VALUES IN ('{collection}')"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {partition}_embedding_idx "
+            f"ON {partition} USING hnsw (embedding vector_cosine_ops)"
+        ))
+    
+    def list_partitions(self) -> List[str]:
+        """List collections that have a chunks partition"""
+        query = text("""
+            SELECT pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+        """)
+        with self.engine.connect() as connection:
+            bounds = connection.execute(query, {"table": Chunk.__tablename__}).scalars().all()
+        
+        # Bounds look like "FOR VALUES IN ('collection')"
+        collections = []
+        for bound in bounds:
+            collections.extend(re.findall(r"'([^']*)'", bound))
+        return sorted(collections)
+    
     def get_db(self) -> Session:
         """Get database session"""
         db = self.SessionLocal()
@@ -52,7 +171,9 @@ class DocumentRepository:
         try:
             db_document = Document(
                 filename=document_data.filename,
-                content_type=document_data.content_type
+                content_type=document_data.content_type,
+                collection=document_data.collection,
+                chunk_overlap=document_data.chunk_overlap
             )
             self.db.add(db_document)
             self.db.commit()
@@ -73,12 +194,14 @@ class DocumentRepository:
 class ChunkRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.search_backend = os.getenv("VECTOR_SEARCH_BACKEND", "postgres")
     
     def create_chunk(self, chunk_data: ChunkCreate) -> Chunk:
         """Create a new chunk record"""
         try:
             db_chunk = Chunk(
                 document_id=chunk_data.document_id,
+                collection=chunk_data.collection,
                 chunk_text=chunk_data.chunk_text,
                 chunk_index=chunk_data.chunk_index,
                 embedding=chunk_data.embedding
@@ -98,6 +221,7 @@ class ChunkRepository:
             for chunk_data in chunks_data:
                 db_chunk = Chunk(
                     document_id=chunk_data.document_id,
+                    collection=chunk_data.collection,
                     chunk_text=chunk_data.chunk_text,
                     chunk_index=chunk_data.chunk_index,
                     embedding=chunk_data.embedding
@@ -119,38 +243,213 @@ class ChunkRepository:
         """Get all chunks for a specific document"""
         return self.db.query(Chunk).filter(Chunk.document_id == document_id).all()
     
-    def search_similar_chunks(self, query_embedding: List[float], limit: int = 3) -> List[Tuple[Chunk, float]]:
-        """Search for similar chunks using cosine similarity"""
+    def search_similar_chunks(
+        self,
+        query_embedding: List[float],
+        limit: int = 3,
+        collections: Optional[List[str]] = None
+    ) -> List[Tuple[Chunk, float]]:
+        """Search for similar chunks using cosine similarity.
+        
+        Searching several collections fans out one query per partition in
+        parallel and merges the per-partition top results. With
+        VECTOR_SEARCH_BACKEND=snapshot the search runs in-process over the
+        memory-mapped vector snapshot instead.
+        """
+        if collections:
+            # Duplicates would search a partition twice and return its chunks twice
+            collections = list(dict.fromkeys(collections))
+        
+        snapshot = get_vector_snapshot()
+        if self.search_backend == "snapshot" and snapshot is not None and snapshot.available:
+            return self._snapshot_similarity_search(snapshot, query_embedding, limit, collections)
+        
+        if collections and len(collections) > 1:
+            return self._fan_out_similarity_search(query_embedding, limit, collections)
+        
         try:
-            # Using pgvector's cosine distance operator
-            query = text("""
-                SELECT c.*, 1 - (c.embedding <=> :query_embedding) as similarity_score
-                FROM chunks c
-                ORDER BY c.embedding <=> :query_embedding
-                LIMIT :limit
-            """)
-            
-            result = self.db.execute(query, {
-                'query_embedding': str(query_embedding),
-                'limit': limit
-            }).fetchall()
-            
-            chunks_with_scores = []
-            for row in result:
-                chunk = self.db.query(Chunk).filter(Chunk.id == row[0]).first()
-                similarity_score = row[-1]  # Last column is similarity_score
-                chunks_with_scores.append((chunk, similarity_score))
+            # Using pgvector's cosine distance operator, loading chunks in the same round trip
+            distance = Chunk.embedding.cosine_distance(query_embedding)
+            query = self.db.query(Chunk, (1 - distance).label("similarity_score"))
+            if collections:
+                # Filtering on the partition key lets Postgres prune to a single partition
+                query = query.filter(Chunk.collection == collections[0])
+            result = query.order_by(distance).limit(limit).all()
             
-            return chunks_with_scores
+            return [(chunk, similarity_score) for chunk, similarity_score in result]
         except SQLAlchemyError as e:
             # Fallback to brute force if pgvector is not available
-            return self._brute_force_similarity_search(query_embedding, limit)
+            self.db.rollback()
+            return self._brute_force_similarity_search(query_embedding, limit, collections)
     
-    def _brute_force_similarity_search(self, query_embedding: List[float], limit: int) -> List[Tuple[Chunk, float]]:
+    def _fan_out_similarity_search(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        collections: List[str]
+    ) -> List[Tuple[Chunk, float]]:
+        """Search each collection's partition on its own session and merge the results"""
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.db.get_bind())
+        
+        def search_partition(collection: str) -> List[Tuple[Chunk, float]]:
+            db = session_factory()
+            try:
+                return ChunkRepository(db).search_similar_chunks(query_embedding, limit, [collection])
+            finally:
+                db.close()
+        
+        partition_results = _get_partition_executor().map(search_partition, collections)
+        
+        merged = [item for results in partition_results for item in results]
+        merged.sort(key=lambda x: x[1], reverse=True)
+        return merged[:limit]
+    
+    def iter_similar_chunks(
+        self,
+        query_embedding: List[float],
+        limit: int = 10,
+        include_text: bool = True,
+        collections: Optional[List[str]] = None,
+        batch_size: int = 20
+    ) -> Iterator[Tuple]:
+        """Stream (id, document_id, chunk_index, similarity_score[, chunk_text]) rows from a server-side cursor"""
+        distance = Chunk.embedding.cosine_distance(query_embedding)
+        columns = [Chunk.id, Chunk.document_id, Chunk.chunk_index, (1 - distance).label("similarity_score")]
+        if include_text:
+            columns.append(Chunk.chunk_text)
+        
+        query = select(*columns).order_by(distance).limit(limit)
+        if collections:
+            query = query.where(Chunk.collection.in_(collections))
+        try:
+            result = self.db.execute(
+                query, execution_options={"stream_results": True, "yield_per": batch_size}
+            )
+        except SQLAlchemyError as e:
+            # Fallback to brute force if pgvector is not available
+            self.db.rollback()
+            for chunk, similarity_score in self._brute_force_similarity_search(query_embedding, limit, collections):
+                row = (chunk.id, chunk.document_id, chunk.chunk_index, similarity_score)
+                yield row + (chunk.chunk_text,) if include_text else row
+            return
+        
+        try:
+            for row in result:
+                yield tuple(row)
+        finally:
+            result.close()
+    
+    def expand_context(
+        self,
+        hits: List[Tuple[Chunk, float]],
+        window: int,
+        overlap: int
+    ) -> List[Tuple]:
+        """Expand hits with their neighbouring chunks in a single query.
+        
+        Each hit becomes the chunk range [index - window, index + window] of its
+        document. Overlapping or adjacent ranges are merged, and the words each
+        chunk repeats from its predecessor are dropped before the texts are
+        joined, using the overlap recorded on the document at ingest time.
+        `overlap` is only used for documents ingested before that was
+        recorded. Returns (document_id,
+        start_chunk_index, end_chunk_index, hit_chunk_indexes,
+        similarity_score, context_text) rows in the order of their best hit.
+        """
+        if not hits:
+            return []
+        
+        query = text("""
+            WITH hits AS (
+                SELECT *
+                FROM unnest(
+                    CAST(:collections AS varchar[]),
+                    CAST(:document_ids AS uuid[]),
+                    CAST(:chunk_indexes AS integer[]),
+                    CAST(:scores AS double precision[])
+                ) WITH ORDINALITY AS h(collection, document_id, chunk_index, similarity_score, hit_rank)
+            ),
+            windows AS (
+                SELECT collection, document_id, chunk_index, similarity_score, hit_rank,
+                       GREATEST(chunk_index - :window, 0) AS lo,
+                       chunk_index + :window AS hi
+                FROM hits
+            ),
+            flagged AS (
+                -- A window starts a new group unless it overlaps or touches an earlier one
+                SELECT *,
+                       CASE WHEN lo <= MAX(hi) OVER (
+                                PARTITION BY document_id ORDER BY lo, hi
+                                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                            ) + 1
+                            THEN 0 ELSE 1 END AS starts_group
+                FROM windows
+            ),
+            grouped AS (
+                SELECT *,
+                       SUM(starts_group) OVER (
+                           PARTITION BY document_id ORDER BY lo, hi ROWS UNBOUNDED PRECEDING
+                       ) AS group_id
+                FROM flagged
+            ),
+            merged AS (
+                SELECT collection, document_id, group_id,
+                       MIN(lo) AS lo, MAX(hi) AS hi,
+                       MAX(similarity_score) AS similarity_score,
+                       MIN(hit_rank) AS hit_rank,
+                       array_agg(DISTINCT chunk_index ORDER BY chunk_index) AS hit_chunk_indexes
+                FROM grouped
+                GROUP BY collection, document_id, group_id
+            )
+            SELECT m.document_id,
+                   MIN(c.chunk_index) AS start_chunk_index,
+                   MAX(c.chunk_index) AS end_chunk_index,
+                   m.hit_chunk_indexes,
+                   m.similarity_score,
+                   string_agg(
+                       CASE WHEN c.chunk_index = m.lo THEN c.chunk_text
+                            ELSE array_to_string(
+                                (string_to_array(c.chunk_text, ' '))[COALESCE(d.chunk_overlap, CAST(:overlap AS integer)) + 1:], ' '
+                            )
+                       END,
+                       ' ' ORDER BY c.chunk_index
+                   ) AS context_text
+            FROM merged m
+            JOIN chunks c
+              ON c.collection = m.collection
+             AND c.document_id = m.document_id
+             AND c.chunk_index BETWEEN m.lo AND m.hi
+            JOIN documents d ON d.id = m.document_id
+            GROUP BY m.collection, m.document_id, m.group_id, m.hit_chunk_indexes, m.similarity_score, m.hit_rank
+            ORDER BY m.hit_rank
+        """)
+        
+        return [tuple(row) for row in self.db.execute(query, {
+            'collections': [chunk.collection for chunk, _ in hits],
+            'document_ids': [str(chunk.document_id) for chunk, _ in hits],
+            'chunk_indexes': [chunk.chunk_index for chunk, _ in hits],
+            'scores': [float(score) for _, score in hits],
+            'window': window,
+            'overlap': overlap
+        }).fetchall()]
+    
+    def _brute_force_similarity_search(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        collections: Optional[List[str]] = None
+    ) -> List[Tuple[Chunk, float]]:
         """Fallback similarity search without pgvector"""
         import numpy as np
         
-        all_chunks = self.db.query(Chunk).all()
+        snapshot = get_vector_snapshot()
+        if snapshot is not None and snapshot.available:
+            return self._snapshot_similarity_search(snapshot, query_embedding, limit, collections)
+        
+        query = self.db.query(Chunk)
+        if collections:
+            query = query.filter(Chunk.collection.in_(collections))
+        all_chunks = query.all()
         similarities = []
         
         for chunk in all_chunks:
@@ -167,6 +466,28 @@ class ChunkRepository:
         similarities.sort(key=lambda x: x[1], reverse=True)
         return similarities[:limit]
     
+    def _snapshot_similarity_search(
+        self,
+        snapshot: VectorSnapshot,
+        query_embedding: List[float],
+        limit: int,
+        collections: Optional[List[str]] = None
+    ) -> List[Tuple[Chunk, float]]:
+        """Search the vector snapshot, then load only the matching chunks"""
+        hits = snapshot.search(query_embedding, limit, collections)
+        if not hits:
+            return []
+        
+        chunks = self.db.query(Chunk).filter(Chunk.id.in_([chunk_id for chunk_id, _ in hits])).all()
+        chunks_by_id = {chunk.id: chunk for chunk in chunks}
+        
+        # Chunks removed since the snapshot was taken are skipped
+        return [
+            (chunks_by_id[chunk_id], similarity_score)
+            for chunk_id, similarity_score in hits
+            if chunk_id in chunks_by_id
+        ]
+    
     def count_chunks_by_document(self, document_id: str) -> int:
         """Count chunks for a specific document"""
         return self.db.query(Chunk).filter(Chunk.document_id == document_id).count()
\ No newline at end of file
@@ -1,4 +1,3 @@
-from openai import OpenAI
 from typing import List
 import os
 from dotenv import load_dotenv
@@ -8,6 +7,9 @@ load_dotenv()
 
 class EmbeddingService:
     def __init__(self):
+        # Imported on first use to keep worker start-up light
+        from openai import OpenAI
+        
         try:
             # Using Gemini APIs
             self.client = OpenAI(
@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+import math
+import os
+import re
+import threading
+import time
+from dotenv import load_dotenv
+import logging
+
+from app.models.models import Chunk
+
+load_dotenv()
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Scores the candidates in [start, end) of the set a re-ranker was prepared with
+BatchScorer = Callable[[int, int], List[float]]
+
+# Shared across requests so re-ranking does not pay thread start-up on every query
+_executor: Optional[ThreadPoolExecutor] = None
+# Bounds batches queued or running on the pool, so a slow re-ranker cannot build a backlog
+_pending_batches: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _pending_batches
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv("RERANK_WORKERS", 4))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank")
+            _pending_batches = threading.BoundedSemaphore(int(os.getenv("RERANK_MAX_PENDING", workers * 2)))
+    return _executor, _pending_batches
+
+
+class LexicalOverlapReranker:
+    """Scores chunks by query term overlap, weighted by term rarity within the candidate set"""
+
+    def prepare(self, query: str, texts: List[str]) -> BatchScorer:
+        """Compute term weights over all candidates once, so scores from every batch are comparable"""
+        query_terms = set(_TOKEN_PATTERN.findall(query.lower()))
+        text_terms = [set(_TOKEN_PATTERN.findall(text.lower())) for text in texts]
+
+        # Terms present in every candidate carry little signal
+        weights = {}
+        for term in query_terms:
+            doc_freq = sum(1 for terms in text_terms if term in terms)
+            weights[term] = math.log((len(texts) + 1) / (doc_freq + 0.5))
+        total_weight = sum(weights.values()) or 1.0
+
+        def score_batch(start: int, end: int) -> List[float]:
+            return [
+                sum(weight for term, weight in weights.items() if term in terms) / total_weight
+                for terms in text_terms[start:end]
+            ]
+
+        return score_batch
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        return self.prepare(query, texts)(0, len(texts))
+
+
+class CrossEncoderReranker:
+    """Scores (query, chunk) pairs with a small local cross-encoder model"""
+
+    def __init__(self, model_name: str):
+        # Optional dependency, only needed when this re-ranker is configured
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def prepare(self, query: str, texts: List[str]) -> BatchScorer:
+        def score_batch(start: int, end: int) -> List[float]:
+            scores = self.model.predict([(query, text) for text in texts[start:end]])
+            return [float(score) for score in scores]
+
+        return score_batch
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        return self.prepare(query, texts)(0, len(texts))
+
+
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(name: str):
+    """Get a (cached) re-ranker by name: "lexical" or "cross-encoder".
+
+    Loading happens once per process under a lock; call it at worker start
+    so the first queries do not pay for loading a model.
+    """
+    with _rerankers_lock:
+        if name not in _rerankers:
+            if name == "lexical":
+                _rerankers[name] = LexicalOverlapReranker()
+            elif name == "cross-encoder":
+                _rerankers[name] = CrossEncoderReranker(
+                    os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+                )
+            else:
+                raise ValueError(f"Unknown re-ranker: {name}")
+        return _rerankers[name]
+
+
+class RerankService:
+    def __init__(self):
+        self.enabled = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+        self.reranker_name = os.getenv("RERANKER", "lexical")
+        self.candidates = int(os.getenv("RERANK_CANDIDATES", 30))
+        self.batch_size = int(os.getenv("RERANK_BATCH_SIZE", 16))
+        self.time_budget = float(os.getenv("RERANK_TIME_BUDGET_MS", 150)) / 1000
+        self.logger = logging.getLogger(__name__)
+
+    def warm_up(self):
+        """Load the configured re-ranker if re-ranking is enabled"""
+        if self.enabled:
+            get_reranker(self.reranker_name)
+            self.logger.info(f"Loaded {self.reranker_name} re-ranker")
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Tuple[Chunk, float]],
+        limit: int
+    ) -> List[Tuple[Chunk, float, Optional[float]]]:
+        """Re-rank vector search candidates and return the top `limit`.
+
+        Candidates are scored in batches on the worker pool. Batches that do not
+        finish within the time budget, or that find the pool saturated, keep
+        their vector order and are ranked after the re-scored ones, so a slow
+        re-ranker never adds more than the budget to the request.
+        """
+        if not candidates:
+            return []
+
+        reranker = get_reranker(self.reranker_name)
+        executor, pending_batches = _get_executor()
+        start_time = time.time()
+
+        score_batch = reranker.prepare(query, [chunk.chunk_text for chunk, _ in candidates])
+
+        futures = {}
+        skipped = 0
+        for offset in range(0, len(candidates), self.batch_size):
+            if not pending_batches.acquire(blocking=False):
+                skipped += 1
+                continue
+            future = executor.submit(score_batch, offset, min(offset + self.batch_size, len(candidates)))
+            future.add_done_callback(lambda _: pending_batches.release())
+            futures[future] = offset
+
+        done, not_done = wait(futures, timeout=self.time_budget)
+        for future in not_done:
+            future.cancel()
+
+        rerank_scores: List[Optional[float]] = [None] * len(candidates)
+        for future in done:
+            try:
+                scores = future.result()
+            except Exception as e:
+                self.logger.error(f"Error re-ranking batch: {e}")
+                continue
+            offset = futures[future]
+            rerank_scores[offset:offset + len(scores)] = scores
+
+        if not_done or skipped:
+            self.logger.warning(
+                f"Re-ranking incomplete: {len(not_done)} batches over the time budget and {skipped} "
+                f"skipped on a saturated pool, out of {len(futures) + skipped}; they keep vector order"
+            )
+
+        ranked = [
+            (chunk, similarity_score, rerank_scores[i])
+            for i, (chunk, similarity_score) in enumerate(candidates)
+        ]
+        # Python's sort is stable, so unscored candidates keep their vector order
+        ranked.sort(key=lambda item: (item[2] is None, -(item[2] or 0.0)))
+
+        self.logger.debug(f"Re-ranked {len(candidates)} candidates in {time.time() - start_time:.3f}s")
+        return ranked[:limit]
@@ -0,0 +1,259 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, List, NamedTuple, Optional, Tuple
+from datetime import datetime
+import json
+import os
+import uuid
+from dotenv import load_dotenv
+import logging
+
+from app.models.models import Chunk
+
+load_dotenv()
+
+# One row per chunk in each data file; meta.json records how many rows are valid
+IDS_FILE = "ids.bin"
+EMBEDDINGS_FILE = "embeddings.f32"
+COLLECTIONS_FILE = "collections.u16"
+CREATED_AT_FILE = "created_at.f64"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+
+def _read_meta(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class VectorSnapshotWriter:
+    """Exports chunk ids and normalised float32 embeddings to append-only files.
+
+    Refreshes are incremental: only chunks created since the high-water mark
+    (minus a safety lag for late commits) are read from Postgres. A chunk
+    committed more than VECTOR_SNAPSHOT_LAG_SECONDS after its created_at,
+    once the high-water mark has moved past it, is never picked up, so
+    chunk inserts stamp created_at at insert time and commit promptly. Data files
+    are appended and fsynced before meta.json is atomically replaced, so
+    readers never see rows that are not fully written.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lag_seconds = float(os.getenv("VECTOR_SNAPSHOT_LAG_SECONDS", 60))
+        self.batch_size = int(os.getenv("VECTOR_SNAPSHOT_BATCH_SIZE", 1000))
+        self.logger = logging.getLogger(__name__)
+
+    def refresh(self, db: Session, blocking: bool = True) -> int:
+        """Append chunks created since the last refresh, returns the number of rows added.
+
+        With blocking=False the refresh is skipped when another writer holds
+        the lock; whatever it misses is picked up by the next refresh.
+        """
+        import fcntl
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), "w") as lock:
+            # Only one writer at a time across workers; readers never take the lock
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.logger.info("Vector snapshot refresh already running, skipping")
+                return 0
+            try:
+                return self._refresh_locked(db)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _refresh_locked(self, db: Session) -> int:
+        import numpy as np
+
+        meta = _read_meta(self.directory) or {
+            "count": 0,
+            "dim": None,
+            "collections": [],
+            "high_water_mark": None
+        }
+        count = meta["count"]
+
+        # Drop anything a crashed refresh appended past the last committed count
+        # (an empty snapshot has no dim yet, and nothing to keep either)
+        row_sizes = {IDS_FILE: 16, COLLECTIONS_FILE: 2, CREATED_AT_FILE: 8, EMBEDDINGS_FILE: 4 * (meta["dim"] or 0)}
+        for name, row_size in row_sizes.items():
+            if os.path.exists(self._path(name)):
+                os.truncate(self._path(name), count * row_size)
+
+        query = select(Chunk.id, Chunk.collection, Chunk.created_at, Chunk.embedding).order_by(Chunk.created_at)
+        seen_ids = set()
+        if meta["high_water_mark"] is not None:
+            cutoff = meta["high_water_mark"] - self.lag_seconds
+            query = query.where(Chunk.created_at >= datetime.fromtimestamp(cutoff))
+
+            # Rows inside the lag window may already be in the snapshot
+            if count:
+                created_at = np.memmap(self._path(CREATED_AT_FILE), dtype=np.float64, mode="r", shape=(count,))
+                recent = np.nonzero(created_at >= cutoff)[0]
+                if len(recent):
+                    ids = np.memmap(self._path(IDS_FILE), dtype=np.uint8, mode="r", shape=(count, 16))
+                    seen_ids = {bytes(ids[i]) for i in recent}
+
+        collections = meta["collections"]
+        collection_codes = {name: code for code, name in enumerate(collections)}
+        high_water_mark = meta["high_water_mark"]
+        added = 0
+
+        result = db.execute(query, execution_options={"stream_results": True, "yield_per": self.batch_size})
+        try:
+            with open(self._path(IDS_FILE), "ab") as ids_file, \
+                    open(self._path(EMBEDDINGS_FILE), "ab") as embeddings_file, \
+                    open(self._path(COLLECTIONS_FILE), "ab") as collections_file, \
+                    open(self._path(CREATED_AT_FILE), "ab") as created_at_file:
+                for batch in result.partitions():
+                    batch = [row for row in batch if row.id.bytes not in seen_ids]
+                    if not batch:
+                        continue
+
+                    embeddings = np.asarray([row.embedding for row in batch], dtype=np.float32)
+                    if meta["dim"] is None:
+                        meta["dim"] = embeddings.shape[1]
+                    # Stored normalised so cosine similarity is a plain dot product
+                    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                    embeddings /= np.where(norms == 0, 1, norms)
+
+                    for row in batch:
+                        if row.collection not in collection_codes:
+                            collection_codes[row.collection] = len(collections)
+                            collections.append(row.collection)
+                    codes = np.asarray([collection_codes[row.collection] for row in batch], dtype=np.uint16)
+                    created_at = np.asarray([row.created_at.timestamp() for row in batch], dtype=np.float64)
+
+                    ids_file.write(b"".join(row.id.bytes for row in batch))
+                    embeddings_file.write(embeddings.tobytes())
+                    collections_file.write(codes.tobytes())
+                    created_at_file.write(created_at.tobytes())
+
+                    added += len(batch)
+                    high_water_mark = max(high_water_mark or 0.0, float(created_at.max()))
+
+                for data_file in (ids_file, embeddings_file, collections_file, created_at_file):
+                    data_file.flush()
+                    os.fsync(data_file.fileno())
+        finally:
+            result.close()
+
+        if added:
+            meta.update(count=count + added, collections=collections, high_water_mark=high_water_mark)
+            temp_path = self._path(META_FILE + ".tmp")
+            with open(temp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(temp_path, self._path(META_FILE))
+
+        self.logger.info(f"Vector snapshot refreshed: {added} chunks added, {count + added} total")
+        return added
+
+
+class _SnapshotState(NamedTuple):
+    """Everything one search reads, published together so searches never mix two refreshes"""
+    meta_mtime: int
+    meta: dict
+    ids: Any
+    embeddings: Any
+    collections: Any
+
+
+class VectorSnapshot:
+    """Read-only view of a snapshot, memory-mapped so workers share it through the page cache"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.logger = logging.getLogger(__name__)
+        self._state: Optional[_SnapshotState] = None
+
+    def _current_state(self) -> Optional[_SnapshotState]:
+        """Get the mapped state, remapping first if a writer has published a new meta.json"""
+        import numpy as np
+
+        state = self._state
+        try:
+            mtime = os.stat(os.path.join(self.directory, META_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if state is not None and mtime == state.meta_mtime:
+            return state
+
+        meta = _read_meta(self.directory)
+        if not meta or not meta["count"]:
+            return None
+
+        count, dim = meta["count"], meta["dim"]
+        # Files may have grown past `count` since meta was written; map only committed rows
+        state = _SnapshotState(
+            meta_mtime=mtime,
+            meta=meta,
+            ids=np.memmap(os.path.join(self.directory, IDS_FILE), dtype=np.uint8, mode="r", shape=(count, 16)),
+            embeddings=np.memmap(
+                os.path.join(self.directory, EMBEDDINGS_FILE), dtype=np.float32, mode="r", shape=(count, dim)
+            ),
+            collections=np.memmap(
+                os.path.join(self.directory, COLLECTIONS_FILE), dtype=np.uint16, mode="r", shape=(count,)
+            )
+        )
+        # A single assignment, so concurrent searches see either the old or the new state
+        self._state = state
+        self.logger.info(f"Mapped vector snapshot with {count} chunks")
+        return state
+
+    @property
+    def available(self) -> bool:
+        return self._current_state() is not None
+
+    def search(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        collections: Optional[List[str]] = None
+    ) -> List[Tuple[uuid.UUID, float]]:
+        """Exact cosine search over the snapshot, returns (chunk_id, similarity_score) pairs"""
+        import numpy as np
+
+        state = self._current_state()
+        if state is None:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = state.embeddings @ query
+
+        if collections:
+            known = state.meta["collections"]
+            codes = [known.index(c) for c in collections if c in known]
+            scores = np.where(np.isin(state.collections, codes), scores, -np.inf)
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (uuid.UUID(bytes=bytes(state.ids[i])), float(scores[i]))
+            for i in top
+            if scores[i] != -np.inf
+        ]
+
+
+_snapshot: Optional[VectorSnapshot] = None
+
+
+def get_vector_snapshot() -> Optional[VectorSnapshot]:
+    """Get the process-wide snapshot reader, or None when VECTOR_SNAPSHOT_DIR is not set"""
+    global _snapshot
+    directory = os.getenv("VECTOR_SNAPSHOT_DIR")
+    if not directory:
+        return None
+    if _snapshot is None:
+        _snapshot = VectorSnapshot(directory)
+    return _snapshot
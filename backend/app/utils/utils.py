@@ -1,4 +1,3 @@
-import PyPDF2
 from typing import List, BinaryIO
 import os
 from dotenv import load_dotenv
@@ -14,6 +13,9 @@ class TextProcessor:
     
     def extract_text_from_pdf(self, file: BinaryIO) -> str:
         """Extract text from PDF file"""
+        # Imported on first use to keep worker start-up light
+        import PyPDF2
+        
         try:
             pdf_reader = PyPDF2.PdfReader(file)
             text = ""
@@ -1,3 +1,7 @@
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -5,7 +9,7 @@ import logging
 import uvicorn
 
 from app.routes.routes import api_router
-from app.services.db_interaction import DatabaseManager
+from app.services.rerank_service import RerankService
 
 
 logging.basicConfig(
@@ -14,6 +18,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_app_import_time = time.perf_counter() - _import_started
+
 app = FastAPI(
     title="Mini-RAG Service",
     description="A minimal RAG (Retrieval-Augmented Generation) service for document ingestion and semantic search",
@@ -44,11 +50,10 @@ async def root():
     }
 
 # Startup event
+# Schema and extension setup is a one-shot step: run `python -m app.manage migrate`
+# before starting workers instead of repeating it in every worker
 @app.on_event("startup")
 async def startup_event():
-    try:
-        db_manager = DatabaseManager()
-        db_manager.create_tables()
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Error during")
\ No newline at end of file
+    # Load the re-ranker model (if enabled) before serving rather than on the first query
+    RerankService().warm_up()
+    logger.info(f"Worker ready, application imported in {_app_import_time:.3f}s")
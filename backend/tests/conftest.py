@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    """Postgres with pgvector: TEST_DATABASE_URL if set, else a throwaway pgserver instance"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+
+    pgserver = pytest.importorskip("pgserver", reason="set TEST_DATABASE_URL or install pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server.get_uri()
+
+
+@pytest.fixture
+def db_manager(database_url, monkeypatch):
+    """DatabaseManager on an empty public schema"""
+    from sqlalchemy import text
+
+    from app.services.db_interaction import DatabaseManager
+
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    manager = DatabaseManager()
+    with manager.engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    yield manager
+    manager.engine.dispose()
@@ -0,0 +1,75 @@
+import json
+import logging
+import uuid
+
+from app.controller.controller import DocumentController
+
+CHUNK_ID = uuid.uuid4()
+DOCUMENT_ID = uuid.uuid4()
+
+
+def make_controller():
+    # _format_stream only needs a logger; skip the embedding client set up in __init__
+    controller = DocumentController.__new__(DocumentController)
+    controller.logger = logging.getLogger("test")
+    return controller
+
+
+def format_stream(rows, stream_format):
+    return list(make_controller()._format_stream(iter(rows), stream_format, start_time=0.0))
+
+
+def test_ndjson_emits_one_json_line_per_row():
+    lines = format_stream([(CHUNK_ID, DOCUMENT_ID, 2, 0.9, "some text")], "ndjson")
+
+    assert len(lines) == 1
+    assert lines[0].endswith("\n")
+    assert json.loads(lines[0]) == {
+        "chunk_id": str(CHUNK_ID),
+        "document_id": str(DOCUMENT_ID),
+        "chunk_index": 2,
+        "similarity_score": 0.9,
+        "chunk_text": "some text",
+    }
+
+
+def test_ids_only_rows_omit_chunk_text():
+    lines = format_stream([(CHUNK_ID, DOCUMENT_ID, 2, 0.9)], "ndjson")
+
+    assert "chunk_text" not in json.loads(lines[0])
+
+
+def test_sse_frames_results_and_ends_with_done_summary():
+    events = format_stream(
+        [(CHUNK_ID, DOCUMENT_ID, 0, 0.9), (uuid.uuid4(), DOCUMENT_ID, 1, 0.8)],
+        "sse"
+    )
+
+    assert len(events) == 3
+    for event in events[:2]:
+        assert event.startswith("event: result\ndata: ")
+        assert event.endswith("\n\n")
+    assert json.loads(events[0].split("data: ", 1)[1])["chunk_index"] == 0
+
+    assert events[2].startswith("event: done\ndata: ")
+    assert json.loads(events[2].split("data: ", 1)[1])["count"] == 2
+
+
+def failing_rows():
+    yield (CHUNK_ID, DOCUMENT_ID, 0, 0.9)
+    raise RuntimeError("cursor lost")
+
+
+def test_sse_reports_errors_in_band():
+    events = list(make_controller()._format_stream(failing_rows(), "sse", start_time=0.0))
+
+    assert events[0].startswith("event: result")
+    assert events[1] == 'event: error\ndata: {"error": "cursor lost"}\n\n'
+    assert len(events) == 2
+
+
+def test_ndjson_reports_errors_in_band():
+    lines = list(make_controller()._format_stream(failing_rows(), "ndjson", start_time=0.0))
+
+    assert json.loads(lines[1]) == {"error": "cursor lost"}
+    assert len(lines) == 2
@@ -0,0 +1,179 @@
+import pytest
+
+from app.services.db_interaction import DatabaseManager
+
+
+def test_partition_name_for_valid_collection():
+    assert DatabaseManager.partition_name("team_a") == "chunks_team_a"
+
+
+@pytest.mark.parametrize("collection", ["abc\n", "Team", "a-b", "", "x" * 49, "a'); drop"])
+def test_partition_name_rejects_invalid_collection(collection):
+    with pytest.raises(ValueError):
+        DatabaseManager.partition_name(collection)
+
+
+def test_create_tables_upgrades_unpartitioned_database(db_manager):
+    from sqlalchemy import text
+
+    # Schema as created before collections were added
+    with db_manager.engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        connection.execute(text("""
+            CREATE TABLE documents (
+                id UUID PRIMARY KEY, filename VARCHAR(255) NOT NULL,
+                content_type VARCHAR(100) NOT NULL, upload_timestamp TIMESTAMP DEFAULT now()
+            )
+        """))
+        connection.execute(text("""
+            CREATE TABLE chunks (
+                id UUID PRIMARY KEY, document_id UUID NOT NULL, chunk_text TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL, embedding VECTOR(768) NOT NULL, created_at TIMESTAMP DEFAULT now()
+            )
+        """))
+        connection.execute(text("""
+            INSERT INTO documents (id, filename, content_type)
+            VALUES ('00000000-0000-0000-0000-000000000001', 'a.txt', 'text/plain')
+        """))
+        connection.execute(text("""
+            INSERT INTO chunks (id, document_id, chunk_text, chunk_index, embedding)
+            VALUES ('00000000-0000-0000-0000-000000000002', '00000000-0000-0000-0000-000000000001',
+                    'hello', 0, array_fill(0.5, ARRAY[768])::vector)
+        """))
+
+    db_manager.create_tables()
+    # Running it again is a no-op
+    db_manager.create_tables()
+
+    with db_manager.engine.connect() as connection:
+        assert connection.execute(text("SELECT collection, chunk_overlap FROM documents")).one() == ("default", None)
+        assert connection.execute(text("SELECT collection, chunk_text FROM chunks_default")).one() == ("default", "hello")
+        assert connection.execute(text("SELECT to_regclass('chunks_unpartitioned')")).scalar() is None
+    assert db_manager.list_partitions() == ["default"]
+
+
+def test_create_partition_routes_chunks_by_collection(db_manager):
+    from sqlalchemy import text
+
+    db_manager.create_tables()
+    db_manager.create_partition("team_a")
+
+    assert db_manager.list_partitions() == ["default", "team_a"]
+    with db_manager.engine.connect() as connection:
+        indexes = connection.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'chunks_team_a'"
+        )).scalars().all()
+    assert "chunks_team_a_embedding_idx" in indexes
+
+
+def test_search_with_duplicate_collections_returns_each_chunk_once(db_manager):
+    import uuid
+
+    from app.models.scheme import ChunkCreate
+    from app.services.db_interaction import ChunkRepository
+
+    db_manager.create_tables()
+    db_manager.create_partition("team_a")
+    db = db_manager.SessionLocal()
+    try:
+        repo = ChunkRepository(db)
+        repo.create_chunks_batch([
+            ChunkCreate(document_id=uuid.uuid4(), collection=collection, chunk_text=collection,
+                        chunk_index=0, embedding=[1.0] * 768)
+            for collection in ("team_a", "default")
+        ])
+
+        results = repo.search_similar_chunks([1.0] * 768, limit=10, collections=["team_a", "team_a", "default"])
+    finally:
+        db.close()
+
+    assert sorted(chunk.collection for chunk, _ in results) == ["default", "team_a"]
+
+
+def ingest_words(db, words, chunk_size, overlap, store_overlap=True):
+    """Chunk words the way ingest does and store them, returning the document id"""
+    from app.models.scheme import ChunkCreate, DocumentCreate
+    from app.services.db_interaction import ChunkRepository, DocumentRepository
+    from app.utils.utils import TextProcessor
+
+    processor = TextProcessor()
+    processor.chunk_size, processor.chunk_overlap = chunk_size, overlap
+    document = DocumentRepository(db).create_document(DocumentCreate(
+        filename="doc.txt", content_type="text/plain", chunk_overlap=overlap if store_overlap else None
+    ))
+    ChunkRepository(db).create_chunks_batch([
+        ChunkCreate(document_id=document.id, chunk_text=chunk_text, chunk_index=i, embedding=[1.0] * 768)
+        for i, chunk_text in enumerate(processor.chunk_text(" ".join(words)))
+    ])
+    return document.id
+
+
+def hit(document_id, chunk_index, score):
+    from types import SimpleNamespace
+
+    return (SimpleNamespace(collection="default", document_id=document_id, chunk_index=chunk_index), score)
+
+
+@pytest.fixture
+def context_db(db_manager):
+    db_manager.create_tables()
+    db = db_manager.SessionLocal()
+    yield db
+    db.close()
+
+
+# 20 words in chunks of 5 overlapping by 2: chunk i covers words 3i .. 3i+4, chunks 0-5
+WORDS = [f"w{i}" for i in range(20)]
+
+
+def test_expand_context_clamps_window_at_first_chunk(context_db):
+    from app.services.db_interaction import ChunkRepository
+
+    document_id = ingest_words(context_db, WORDS, chunk_size=5, overlap=2)
+
+    rows = ChunkRepository(context_db).expand_context([hit(document_id, 0, 0.9)], window=1, overlap=2)
+
+    assert rows == [(document_id, 0, 1, [0], 0.9, " ".join(WORDS[0:8]))]
+
+
+def test_expand_context_merges_overlapping_windows(context_db):
+    from app.services.db_interaction import ChunkRepository
+
+    document_id = ingest_words(context_db, WORDS, chunk_size=5, overlap=2)
+
+    rows = ChunkRepository(context_db).expand_context(
+        [hit(document_id, 3, 0.9), hit(document_id, 2, 0.8)], window=1, overlap=2
+    )
+
+    # [2, 4] and [1, 3] become chunks 1-4, words 3 .. 16
+    assert rows == [(document_id, 1, 4, [2, 3], 0.9, " ".join(WORDS[3:17]))]
+
+
+def test_expand_context_merges_adjacent_windows_in_hit_order(context_db):
+    from app.services.db_interaction import ChunkRepository
+
+    document_id = ingest_words(context_db, WORDS, chunk_size=5, overlap=2)
+    other_id = ingest_words(context_db, WORDS, chunk_size=5, overlap=2)
+
+    rows = ChunkRepository(context_db).expand_context(
+        [hit(other_id, 5, 0.95), hit(document_id, 1, 0.9), hit(document_id, 4, 0.7)], window=1, overlap=2
+    )
+
+    # [0, 2] and [3, 5] touch, so the whole document comes back once with no repeated words
+    assert rows == [
+        (other_id, 4, 5, [5], 0.95, " ".join(WORDS[12:20])),
+        (document_id, 0, 5, [1, 4], 0.9, " ".join(WORDS)),
+    ]
+
+
+def test_expand_context_uses_overlap_recorded_at_ingest(context_db):
+    from app.services.db_interaction import ChunkRepository
+
+    recorded_id = ingest_words(context_db, WORDS, chunk_size=5, overlap=2)
+    legacy_id = ingest_words(context_db, WORDS, chunk_size=5, overlap=2, store_overlap=False)
+    repo = ChunkRepository(context_db)
+
+    # The document's own overlap wins over the current setting
+    assert repo.expand_context([hit(recorded_id, 1, 0.9)], window=1, overlap=4)[0][5] == " ".join(WORDS[0:11])
+    # Documents without a recorded overlap fall back to the current setting
+    assert repo.expand_context([hit(legacy_id, 1, 0.9)], window=1, overlap=2)[0][5] == " ".join(WORDS[0:11])
@@ -0,0 +1,17 @@
+from app.manage import parse_import_times
+
+
+def test_parse_import_times_skips_header_and_other_output():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   _io",
+        "import time:       300 |       1500 |     json.decoder",
+        "import time:       200 |       1900 | json",
+        "Traceback (most recent call last):",
+    ])
+
+    assert parse_import_times(output) == [
+        ("_io", 120, 120),
+        ("json.decoder", 300, 1500),
+        ("json", 200, 1900),
+    ]
@@ -0,0 +1,64 @@
+import time
+from types import SimpleNamespace
+
+from app.services import rerank_service
+from app.services.rerank_service import LexicalOverlapReranker, RerankService
+
+
+def make_candidates(texts):
+    # Vector scores descend with position, so vector order is the input order
+    return [(SimpleNamespace(chunk_text=text), 1.0 - i / 100) for i, text in enumerate(texts)]
+
+
+def test_lexical_scorer_prefers_more_matching_terms():
+    scores = LexicalOverlapReranker().score(
+        "postgres vacuum tuning",
+        ["postgres vacuum notes", "postgres intro", "unrelated text"]
+    )
+
+    assert scores[0] > scores[1] > scores[2] == 0.0
+
+
+def test_lexical_scorer_without_query_terms_scores_zero():
+    assert LexicalOverlapReranker().score("???", ["some text", "more text"]) == [0.0, 0.0]
+
+
+def test_rerank_scores_are_comparable_across_batches(monkeypatch):
+    monkeypatch.setenv("RERANK_BATCH_SIZE", "3")
+    texts = [
+        "postgres vacuum notes", "postgres one", "postgres two",
+        "postgres intro", "other one", "other two",
+    ]
+    candidates = make_candidates(texts)
+
+    ranked = RerankService().rerank("postgres vacuum tuning", candidates, limit=len(texts))
+
+    expected = LexicalOverlapReranker().score("postgres vacuum tuning", texts)
+    assert ranked[0][0].chunk_text == "postgres vacuum notes"
+    assert {chunk.chunk_text: score for chunk, _, score in ranked} == dict(zip(texts, expected))
+
+
+def test_rerank_keeps_vector_order_for_batches_over_budget(monkeypatch):
+    class SlowTailReranker:
+        def prepare(self, query, texts):
+            def score_batch(start, end):
+                if start > 0:
+                    time.sleep(0.5)
+                return [float(i) for i in range(start, end)]
+            return score_batch
+
+    monkeypatch.setitem(rerank_service._rerankers, "slow-tail", SlowTailReranker())
+    monkeypatch.setenv("RERANKER", "slow-tail")
+    monkeypatch.setenv("RERANK_BATCH_SIZE", "2")
+    monkeypatch.setenv("RERANK_TIME_BUDGET_MS", "100")
+    candidates = make_candidates(["a", "b", "c", "d"])
+
+    ranked = RerankService().rerank("query", candidates, limit=4)
+
+    # First batch re-scored (b > a), the timed-out batch follows in vector order
+    assert [chunk.chunk_text for chunk, _, _ in ranked] == ["b", "a", "c", "d"]
+    assert [score for _, _, score in ranked] == [1.0, 0.0, None, None]
+
+
+def test_rerank_returns_empty_for_no_candidates():
+    assert RerankService().rerank("query", [], limit=3) == []
@@ -0,0 +1,154 @@
+import fcntl
+import os
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.vector_snapshot import EMBEDDINGS_FILE, IDS_FILE, LOCK_FILE, VectorSnapshot, VectorSnapshotWriter
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class FakeResult:
+    def __init__(self, rows, batch_size):
+        self.rows = rows
+        self.batch_size = batch_size
+
+    def partitions(self):
+        for start in range(0, len(self.rows), self.batch_size):
+            yield self.rows[start:start + self.batch_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Returns the given rows for the refresh query; the created_at filter is not applied"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, execution_options=None):
+        return FakeResult(self.rows, batch_size=2)
+
+
+def make_row(embedding, collection="default", created_at=NOW):
+    return SimpleNamespace(id=uuid.uuid4(), collection=collection, created_at=created_at, embedding=embedding)
+
+
+@pytest.fixture
+def rows():
+    return [
+        make_row([1.0, 0.0, 0.0]),
+        make_row([0.0, 1.0, 0.0], collection="team_a"),
+        make_row([0.0, 0.0, 2.0], collection="team_a"),
+    ]
+
+
+def test_refresh_and_search_round_trip(tmp_path, rows):
+    assert VectorSnapshotWriter(str(tmp_path)).refresh(FakeSession(rows)) == 3
+
+    hits = VectorSnapshot(str(tmp_path)).search([0.0, 0.0, 1.0], limit=2)
+
+    assert hits[0] == (rows[2].id, pytest.approx(1.0))
+    assert len(hits) == 2
+
+
+def test_search_filters_by_collection(tmp_path, rows):
+    VectorSnapshotWriter(str(tmp_path)).refresh(FakeSession(rows))
+    snapshot = VectorSnapshot(str(tmp_path))
+
+    hits = snapshot.search([0.0, 1.0, 0.5], 3, ["team_a"])
+
+    assert [chunk_id for chunk_id, _ in hits] == [rows[1].id, rows[2].id]
+    assert snapshot.search([1.0, 0.0, 0.0], 3, ["missing"]) == []
+
+
+def test_incremental_refresh_skips_rows_already_exported(tmp_path, rows):
+    writer = VectorSnapshotWriter(str(tmp_path))
+    snapshot = VectorSnapshot(str(tmp_path))
+    writer.refresh(FakeSession(rows))
+    assert len(snapshot.search([1.0, 1.0, 1.0], limit=10)) == 3
+
+    new_row = make_row([1.0, 1.0, 0.0], created_at=NOW + timedelta(seconds=5))
+    # Rows inside the lag window come back from the database again
+    assert writer.refresh(FakeSession(rows + [new_row])) == 1
+
+    hits = snapshot.search([1.0, 1.0, 0.0], limit=10)
+    assert len(hits) == 4
+    assert hits[0] == (new_row.id, pytest.approx(1.0))
+
+
+def test_refresh_discards_rows_from_crashed_first_refresh(tmp_path, rows):
+    # A first refresh that died before publishing meta.json
+    with open(tmp_path / EMBEDDINGS_FILE, "wb") as f:
+        f.write(b"\x00" * 4 * 3 * 5)
+    with open(tmp_path / IDS_FILE, "wb") as f:
+        f.write(b"\x00" * 16 * 5)
+
+    VectorSnapshotWriter(str(tmp_path)).refresh(FakeSession(rows))
+
+    assert os.path.getsize(tmp_path / EMBEDDINGS_FILE) == 4 * 3 * len(rows)
+    snapshot = VectorSnapshot(str(tmp_path))
+    for row in rows:
+        assert snapshot.search(row.embedding, limit=1) == [(row.id, pytest.approx(1.0))]
+
+
+def test_non_blocking_refresh_skips_when_lock_is_held(tmp_path, rows):
+    with open(tmp_path / LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert VectorSnapshotWriter(str(tmp_path)).refresh(FakeSession(rows), blocking=False) == 0
+
+    assert not VectorSnapshot(str(tmp_path)).available
+
+
+def insert_chunk(db, created_at=None):
+    from app.models.models import Chunk
+
+    chunk = Chunk(document_id=uuid.uuid4(), chunk_text="text", chunk_index=0, embedding=[1.0] * 768)
+    if created_at is not None:
+        chunk.created_at = created_at
+    db.add(chunk)
+    db.commit()
+    return chunk.id
+
+
+def test_lag_window_limits_late_arrivals(db_manager, tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_SNAPSHOT_LAG_SECONDS", "10")
+    db_manager.create_tables()
+    db = db_manager.SessionLocal()
+    writer = VectorSnapshotWriter(str(tmp_path))
+    try:
+        insert_chunk(db, NOW)
+        assert writer.refresh(db) == 1
+
+        # Both commit after the refresh above, stamped before its high-water mark
+        inside_id = insert_chunk(db, NOW - timedelta(seconds=9))
+        outside_id = insert_chunk(db, NOW - timedelta(seconds=11))
+        assert writer.refresh(db) == 1
+    finally:
+        db.close()
+
+    chunk_ids = {chunk_id for chunk_id, _ in VectorSnapshot(str(tmp_path)).search([1.0] * 768, limit=10)}
+    assert inside_id in chunk_ids
+    assert outside_id not in chunk_ids
+
+
+def test_chunk_created_at_is_insert_time_not_transaction_start(db_manager):
+    from sqlalchemy import text
+
+    from app.models.models import Chunk
+
+    db_manager.create_tables()
+    db = db_manager.SessionLocal()
+    try:
+        transaction_start = db.execute(text("SELECT now()::timestamp")).scalar()
+        db.execute(text("SELECT pg_sleep(0.2)"))
+        chunk_id = insert_chunk(db)
+        created_at = db.query(Chunk.created_at).filter(Chunk.id == chunk_id).scalar()
+    finally:
+        db.close()
+
+    assert (created_at - transaction_start).total_seconds() >= 0.2